@@ -3,33 +3,41 @@
 from dotenv import load_dotenv
 import os
 import json
+import sqlite3
+from utils.lazy import cached_once
 from typing import Annotated, Optional
 from typing_extensions import TypedDict
 from langchain_core.messages import HumanMessage, AIMessage, RemoveMessage, ToolMessage
 from langgraph.graph import StateGraph, END, START
 from langgraph.graph.message import AnyMessage, add_messages
-from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent, AgentState
 from agents.router_agent import router_system_prompt
-from agents.music_agent import get_albums_by_artist, get_tracks_by_artist, music_system_prompt, get_info_about_track
-from agents.customer_agent import get_customer_info, edit_customer_info, customer_system_prompt, past_invoices
+from agents.music_agent import get_albums_by_artist, get_tracks_by_artist, music_system_prompt, get_info_about_track, recommend_similar_tracks
+from agents.customer_agent import get_customer_info, edit_customer_info, past_invoices, get_customer_profile, account_prompt_with_profile
 from agents.general_support import general_support_system_prompt
 from utils.contexts import AccountState, InventoryState, GeneralState
-from utils.model import model
+from utils.model import get_model
+from utils.llm_scheduler import PRIORITY_SUPERVISOR, PRIORITY_BACKGROUND
 from utils.prompt_injection import prompt_injection_guard
+from utils.circuit_breaker import get_breaker
 from pydantic import BaseModel
 from typing import Literal
 from langchain_core.runnables import RunnableConfig
-from langsmith import Client
 from langgraph.checkpoint.sqlite import SqliteSaver
-from langchain.agents.middleware import PIIMiddleware, ToolRetryMiddleware, before_agent, HumanInTheLoopMiddleware, wrap_tool_call
+from langchain.agents.middleware import ToolRetryMiddleware, before_agent, HumanInTheLoopMiddleware, wrap_tool_call
 from langchain.tools import tool, ToolRuntime, InjectedToolCallId
 from langgraph.types import Command
 load_dotenv()
 
 #memory for checkpointer (if not showing through studio)
-memory = SqliteSaver.from_conn_string(":memory:")
-ls_client = Client(api_key=os.getenv("LANGCHAIN_API_KEY"))
+memory = SqliteSaver(sqlite3.connect(":memory:", check_same_thread=False))
+
+#NOTE: everything expensive (db, model clients, sub-agents) is built lazily on first use
+#so importing this module (and the graph) stays fast -> see benchmarks/import_time.py
+@cached_once
+def get_ls_client():
+    from langsmith import Client
+    return Client(api_key=os.getenv("LANGCHAIN_API_KEY"))
 
 #--------STATE DEFINITIONS---------------
 
@@ -39,6 +47,8 @@ class CustomState(TypedDict):
     customer_id: Optional[int] 
     username: Optional[str]
     summary: str
+    customer_profile: Optional[dict] #compact profile snapshot, loaded once per thread
+    customer_profile_for: Optional[str] #customer_id the snapshot was looked up for (also when none was found)
 
 #STATE for supervisor agent
 class SupervisorState(AgentState):
@@ -46,6 +56,8 @@ class SupervisorState(AgentState):
     username: Optional[str]
     summary: str | None = None
     supervisor_state: str | None = None
+    customer_profile: dict | None = None
+    customer_profile_for: str | None = None
 
 class SupervisorContext(BaseModel):
     supervisor_context: str
@@ -61,70 +73,129 @@ def handle_tool_errors(request, handler):
             tool_call_id=request.tool_call["id"]
         )
 
+#fail fast when a tool keeps failing (DB down etc) instead of sleeping through ToolRetryMiddleware backoff
+#sits INSIDE the retry middleware: failures still raise (so retries count towards tripping it),
+#but while open it returns a message instead of raising, so there is nothing left to retry
+@wrap_tool_call
+def tool_circuit_breaker(request, handler):
+    name = request.tool_call["name"]
+    args = request.tool_call.get("args", {})
+    breaker = get_breaker(name)
+    if not breaker.allow():
+        cached = breaker.cached(args)
+        if cached is not None: #degraded: last good answer for the same lookup
+            return ToolMessage(
+                content=f"(cached result - {name} is temporarily unavailable)\n{cached}",
+                tool_call_id=request.tool_call["id"],
+            )
+        return ToolMessage(
+            content=f"{name} is temporarily unavailable, please try again in a little while.",
+            tool_call_id=request.tool_call["id"],
+            status="error",
+        )
+    try:
+        result = handler(request)
+    except Exception:
+        breaker.record_failure()
+        raise #handled by handle_tool_errors / ToolRetryMiddleware
+    if isinstance(result, ToolMessage) and result.status == "error":
+        #ToolInvocationError: bad args from the model, the tool never ran -> neither healthy nor an outage
+        breaker.record_neutral()
+    else:
+        breaker.record_success(args, result.content if isinstance(result, ToolMessage) else None)
+    return result
+
 #main agent supervisor in multi-agent flow
 def supervisor_node(state: CustomState):
     customer_id = state.get("customer_id")
     if not customer_id:
         return {"messages": [AIMessage(content="Please provide your customer ID to continue.")]}
+    #profile snapshot: looked up once per thread (or when the customer_id changes)
+    profile, profile_for = state.get("customer_profile"), state.get("customer_profile_for")
+    if profile_for != str(customer_id):
+        profile, profile_for = _load_profile(customer_id)
     #invoke supervisor agent
-    out = supervisor.invoke({
+    out = get_supervisor().invoke({
         "messages": state["messages"],
         "customer_id": customer_id,
         "username": state.get("username"),
         "supervisor_state": "-SUPERVISOR-",
+        "customer_profile": profile,
+        "customer_profile_for": profile_for,
     }, context=SupervisorContext(supervisor_context="CONTEXT FROM SUPERVISOR AGENT"))
 
     final_ai = _final_ai(out)
     if final_ai is None:
         raise RuntimeError("Supervisor returned no final AI message")
-    return {"messages": [final_ai]} #adding the final AI message to the state
+    #adding the final AI message to the state (+ the profile, refreshed by the account tool after edits)
+    return {
+        "messages": [final_ai],
+        "customer_profile": out.get("customer_profile", profile),
+        "customer_profile_for": out.get("customer_profile_for", profile_for),
+    }
+
+
+def _load_profile(customer_id) -> tuple[Optional[dict], Optional[str]]:
+    """(snapshot, customer_id it is for). The snapshot is only a shortcut, so a Customer DB outage must
+    not fail the turn: we go on without one (the account agent can still call get_customer_info)
+    and leave the marker unset so the next turn tries again."""
+    try:
+        return get_customer_profile(customer_id), str(customer_id)
+    except Exception:
+        return None, None
 
 
 #MIDDLEWARE EXPLANATION!!
     #Human in the loop: after model becasue it checks the tool call to see if one to interrupt on
-    #PII detection can do before model because its revising the output from the tool call as it goes back into the model
+    #PII: no PIIMiddleware regex pass over every tool result - the account tools mask Email/Phone/Address
+    #per column before returning (utils/pii.py, benchmarks/pii_masking.py)
 
 #create account agent
-account_agent = create_agent(
-    model,
-    tools=[get_customer_info, edit_customer_info, past_invoices],
-    system_prompt=customer_system_prompt,
-    middleware=[
-        HumanInTheLoopMiddleware( #{"decisions": [{"type": "approve"}]}
-            interrupt_on={"edit_customer_info": True}
-        ), 
-        PIIMiddleware(
-            "email",
-            strategy="mask",
-            apply_to_input = False, #CHANGE!
-            apply_to_tool_results=True, #CHANGE!
-        )],
-    state_schema=AccountState, #defines what we can read at runtime
-)
+@cached_once
+def get_account_agent():
+    return create_agent(
+        get_model(),
+        tools=[get_customer_info, edit_customer_info, past_invoices],
+        middleware=[
+            account_prompt_with_profile, #system prompt + preloaded profile snapshot
+            HumanInTheLoopMiddleware( #{"decisions": [{"type": "approve"}]}
+                interrupt_on={"edit_customer_info": True}
+            )],
+        state_schema=AccountState, #defines what we can read at runtime
+    )
 
 #Inventory agent
-inventory_agent = create_agent(
-    model,
-    tools=[get_albums_by_artist, get_tracks_by_artist, get_info_about_track],
-    system_prompt=music_system_prompt,
-    middleware=[ToolRetryMiddleware(
-            max_retries=3,  # Retry up to 3 times
-            backoff_factor=2.0,  # Exponential backoff multiplier
-            initial_delay=1.0,  # Start with 1 second delay
-            max_delay=60.0,  # Cap delays at 60 seconds
-            jitter=True,  # Add random jitter to avoid overloading the server)
-        )],
-    state_schema=InventoryState,
-)
+@cached_once
+def get_inventory_agent():
+    return create_agent(
+        get_model(),
+        tools=[get_albums_by_artist, get_tracks_by_artist, get_info_about_track, recommend_similar_tracks],
+        system_prompt=music_system_prompt,
+        #order = outermost first: error handler -> retry -> circuit breaker -> tool
+        middleware=[
+            handle_tool_errors,
+            ToolRetryMiddleware(
+                max_retries=3,  # Retry up to 3 times
+                backoff_factor=2.0,  # Exponential backoff multiplier
+                initial_delay=1.0,  # Start with 1 second delay
+                max_delay=60.0,  # Cap delays at 60 seconds
+                jitter=True,  # Add random jitter to avoid overloading the server)
+            ),
+            tool_circuit_breaker,
+        ],
+        state_schema=InventoryState,
+    )
 
 #general agent for regular inquiries
-general_agent = create_agent(
-    model,
-    tools=[],  # no tools
-    system_prompt=general_support_system_prompt,
-    middleware=[handle_tool_errors],
-    state_schema=GeneralState,
-)
+@cached_once
+def get_general_agent():
+    return create_agent(
+        get_model(),
+        tools=[],  # no tools
+        system_prompt=general_support_system_prompt,
+        middleware=[handle_tool_errors],
+        state_schema=GeneralState,
+    )
 
 #TOOL FOR SUPERVISOR -> CALL ACCOUNT AGENT
 @tool(
@@ -143,20 +214,32 @@ def call_account_agent_tool( #3 inputs: query of tool call, id of tool call, and
     supervisor_state = runtime.state.get("supervisor_state")
     account_state = supervisor_state + "-ACCOUNT-"
 
-    res = account_agent.invoke({
+    res = get_account_agent().invoke({
         "messages": [{"role": "user", "content": query}],
         "customer_id": cid,
         "account_state": account_state,
         "account_example_context": runtime.context, #GET CONTEXT
+        "customer_profile": runtime.state.get("customer_profile"), #answers most profile questions without a tool call
     })
 
     final_text = res["messages"][-1].content
     #UPDATES THE SUPERVISOR AGENT STATE
-    return Command(update={
+    update = {
         "messages": [
             ToolMessage(content=final_text, tool_call_id=tool_call_id)
         ]
-    })
+    }
+    if _edited_profile(res):
+        #refresh the snapshot after an edit (if that fails it is dropped, never left stale)
+        update["customer_profile"], update["customer_profile_for"] = _load_profile(cid)
+    return Command(update=update)
+
+
+def _edited_profile(res: dict) -> bool:
+    return any(
+        isinstance(m, ToolMessage) and m.name == "edit_customer_info" and m.status != "error"
+        for m in res.get("messages", [])
+    )
 
 #for music inventory lookups
 @tool("inventory_agent_tool", description="Use for music inventory lookups: albums, tracks, track details.")
@@ -165,7 +248,7 @@ def call_inventory_agent_tool(
     tool_call_id: Annotated[str, InjectedToolCallId],
     runtime: ToolRuntime[None, SupervisorState],
 ) -> Command:
-    res = inventory_agent.invoke({
+    res = get_inventory_agent().invoke({
         "messages": [{"role": "user", "content": query}],
         "customer_id": runtime.state.get("customer_id"),
     })
@@ -181,7 +264,7 @@ def call_general_agent_tool(
     tool_call_id: Annotated[str, InjectedToolCallId],
     runtime: ToolRuntime[None, SupervisorState],
 ) -> Command:
-    res = general_agent.invoke({
+    res = get_general_agent().invoke({
         "messages": [{"role": "user", "content": query}],
         "customer_id": runtime.state.get("customer_id"),
     })
@@ -192,14 +275,16 @@ def call_general_agent_tool(
 
 
 #supervisor with custom state and context
-supervisor = create_agent(
-    model,
-    tools=[call_account_agent_tool, call_inventory_agent_tool, call_general_agent_tool],  #MULTI AGENT DESIGN
-    system_prompt=router_system_prompt,
-    middleware=[prompt_injection_guard],
-    state_schema=SupervisorState,
-    context_schema=SupervisorContext
-)
+@cached_once
+def get_supervisor():
+    return create_agent(
+        get_model(PRIORITY_SUPERVISOR),
+        tools=[call_account_agent_tool, call_inventory_agent_tool, call_general_agent_tool],  #MULTI AGENT DESIGN
+        system_prompt=router_system_prompt,
+        middleware=[prompt_injection_guard],
+        state_schema=SupervisorState,
+        context_schema=SupervisorContext
+    )
 
 
 #input = list of messages
@@ -239,7 +324,7 @@ def summarize(state: CustomState):
     else:
         sum_message = "Return a summary of the conversation so far. Do not include any other text."
     messages = state["messages"] + [HumanMessage(content=sum_message)]
-    response = model.invoke(messages)
+    response = get_model(PRIORITY_BACKGROUND).invoke(messages) #lowest priority in the LLM scheduler
     last_ai = _last_ai(state)
     del_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]] #remove everything except the last two messages
     return {"summary": response.content, "messages": del_messages}
@@ -1,8 +1,11 @@
 # agents/customer_agent.py
+import json
 from langchain.tools import tool, ToolRuntime
-from utils.database import db
+from langchain.agents.middleware import dynamic_prompt, ModelRequest
+from utils.database import get_engine, execute_write
 from utils.contexts import AccountState
-from typing import Literal
+from utils.pii import mask_rows
+from typing import Literal, Optional
 editable_parameters = ["Address", "Phone", "Email"]
 
 
@@ -19,7 +22,7 @@ def past_invoices(runtime: ToolRuntime[None, AccountState]):
         raise ValueError("Customer ID must be a valid integer")
     
     #NOTE -> this ideally should be ORM (sql injection risk)
-    conn = db._engine.raw_connection()
+    conn = get_engine().raw_connection()
     try:
         cursor = conn.cursor()
         cursor.execute("""
@@ -38,7 +41,7 @@ def past_invoices(runtime: ToolRuntime[None, AccountState]):
         rows = cursor.fetchall()
         cols = [d[0] for d in cursor.description]
         cursor.close()
-        return [dict(zip(cols, row)) for row in rows] #combines columns and rows into a dictionary
+        return mask_rows([dict(zip(cols, row)) for row in rows]) #combines columns and rows into a dictionary (PII columns masked)
     finally:
         conn.close()
 
@@ -58,17 +61,11 @@ def edit_customer_info(runtime: ToolRuntime[None, AccountState], parameter: Lite
     except (ValueError, TypeError):
         raise ValueError("Customer ID must be a valid integer")
 
-    conn = db._engine.raw_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            f"UPDATE Customer SET {parameter} = ? WHERE CustomerID = ?",
-            (value, customer_id),
-        )
-        conn.commit()
-        cursor.close()
-    finally:
-        conn.close()
+    #all Customer writes go through the single writer path (see utils/database.py)
+    execute_write(
+        f"UPDATE Customer SET {parameter} = ? WHERE CustomerID = ?",
+        (value, customer_id),
+    )
 
     return "Customer info updated"
 
@@ -85,17 +82,43 @@ def get_customer_info(runtime: ToolRuntime[None, AccountState]):
     except (ValueError, TypeError):
         raise ValueError("Customer ID must be a valid integer")
 
-    conn = db._engine.raw_connection()
+    return _fetch_customer_rows(customer_id)
+
+
+def _fetch_customer_rows(customer_id: int) -> list[dict]:
+    conn = get_engine().raw_connection()
     try:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM Customer WHERE CustomerID = ?", (customer_id,))
         rows = cursor.fetchall()
         cols = [d[0] for d in cursor.description]
         cursor.close()
-        return [dict(zip(cols, row)) for row in rows]
+        return mask_rows([dict(zip(cols, row)) for row in rows]) #Email/Phone/Address masked before it reaches the model
     finally:
         conn.close()
 
+
+#compact snapshot the supervisor keeps in state (fetched once per thread, refreshed after edits)
+#so the account agent can answer most profile questions without a get_customer_info round trip
+def get_customer_profile(customer_id) -> Optional[dict]:
+    try:
+        customer_id = int(customer_id)
+    except (ValueError, TypeError):
+        return None
+    rows = _fetch_customer_rows(customer_id)
+    if not rows:
+        return None
+    return {k: v for k, v in rows[0].items() if v is not None and k != "SupportRepId"}
+
+
+@dynamic_prompt
+def account_prompt_with_profile(request: ModelRequest) -> str:
+    """customer_system_prompt + the preloaded profile snapshot (if the supervisor passed one)."""
+    profile = (request.state or {}).get("customer_profile")
+    if not profile:
+        return customer_system_prompt
+    return f"{customer_system_prompt}\n\n{customer_profile_prompt}\n{json.dumps(profile, default=str)}"
+
 customer_system_prompt = """You help a user view/update their profile.
 
 - Use get_customer_info (no params) to show current info. This returns ALL customer information.
@@ -103,3 +126,6 @@ customer_system_prompt = """You help a user view/update their profile.
 - Users can ask for ANY customer information - extract and show the requested field(s) from the full dataset.
 - Use edit_customer_info(parameter, value) to update. Only Address, Phone, and Email can be edited.
 - If the request is outside those limits, explain limits politely."""
+
+customer_profile_prompt = """Current profile snapshot for this customer (already loaded - answer questions about these fields directly, without calling get_customer_info; masked values stay masked).
+Only call get_customer_info if you need something that is not in the snapshot or the user asks you to re-check."""
@@ -1,6 +1,6 @@
 # agents/music_agent.py
 from langchain.tools import tool
-from utils.database import db
+from utils.database import get_db
 
 
 #temporary -> need better security but just reminder 
@@ -12,7 +12,7 @@ def get_info_about_track(track_name: str):
     """Get all information about a track/song by its name."""
     escaped = _escape_sql_string(track_name)
     #example: "Let There Be Rock"
-    return db.run(
+    return get_db().run(
         f"SELECT Track.UnitPrice, Track.Composer, Album.Title, Genre.Name as GenreName, MediaType.Name as MediaTypeName FROM Track LEFT JOIN Album ON Track.AlbumId = Album.AlbumId LEFT JOIN Genre ON Track.GenreId = Genre.GenreId LEFT JOIN MediaType ON Track.MediaTypeId = MediaType.MediaTypeId WHERE Track.Name LIKE '%{escaped}%';",
         include_columns=True
     )
@@ -23,7 +23,7 @@ def get_albums_by_artist(artist: str):
     """Get albums by an artist."""
     #example: exception 
     escaped = _escape_sql_string(artist)
-    return db.run(
+    return get_db().run(
         f"""
         SELECT Album.Title, Artist.Name 
         FROM Album 
@@ -37,7 +37,7 @@ def get_albums_by_artist(artist: str):
 def get_tracks_by_artist(artist: str):
     """Get songs by an artist (or similar artists)."""
     escaped = _escape_sql_string(artist)
-    return db.run(
+    return get_db().run(
         f"""
         SELECT Track.Name as SongName, Artist.Name as ArtistName 
         FROM Album 
@@ -47,5 +47,16 @@ def get_tracks_by_artist(artist: str):
         """,
         include_columns=True
     )
+
+@tool
+def recommend_similar_tracks(track_or_artist: str, k: int = 5):
+    """Recommend tracks similar to a track or artist (same genre/artist/album/composer, bought by the same customers)."""
+    from utils.recommendations import get_track_index #numpy + index load deferred to first use
+    recs = get_track_index().recommend(track_or_artist, k=max(1, min(k, 20)))
+    if not recs:
+        return f"No tracks or artists in the catalog match '{track_or_artist}'."
+    return recs
+
 music_system_prompt = """You help customers find songs and albums.
-Use tools to search. If a lookup returns no exact matches, suggest similar artists/tracks."""
+Use tools to search. For recommendations or "similar" artists/tracks (including when a lookup returns no exact matches),
+use recommend_similar_tracks and only suggest what it returns - don't guess."""
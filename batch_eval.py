@@ -0,0 +1,153 @@
+# batch_eval.py
+#Replays recorded conversations through `graph` in parallel (regression + load sweeps).
+#python -m batch_eval --input conversations.jsonl --output results.jsonl --concurrency 16
+#
+#input: one conversation per line
+#  {"id": "conv-1", "customer_id": 5, "turns": ["hi", "whats my email?"]}
+#  ("input": "..." is accepted for single-turn conversations)
+#output: one result per line, streamed as each conversation finishes
+#  {"id", "thread_id", "customer_id", "status": ok|interrupted|error, "replies", "error", "latency_s"}
+#Re-running with the same --output skips conversations already recorded as ok or interrupted (resume);
+#interrupted ones always stop at the same human-in-the-loop approval, pass --retry-interrupted to re-run them.
+import argparse
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Optional
+
+
+def load_conversations(path: str) -> list[dict]:
+    conversations = []
+    first_line: dict[str, int] = {}
+    with open(path) as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            conv = json.loads(line)
+            conv.setdefault("id", str(i))
+            #the id becomes the thread_id -> duplicates would silently share checkpoint state
+            conv_id = str(conv["id"])
+            if conv_id in first_line:
+                raise ValueError(f"{path}:{i + 1}: duplicate conversation id {conv_id!r} (first seen on line {first_line[conv_id]})")
+            first_line[conv_id] = i + 1
+            if "turns" not in conv:
+                conv["turns"] = [conv["input"]]
+            conversations.append(conv)
+    return conversations
+
+
+def completed_ids(output_path: str, retry_interrupted: bool = False) -> set[str]:
+    """ids already finished in a previous run. Errors are always retried; interrupted conversations
+    only with retry_interrupted (they deterministically stop at the same approval)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError: #partial line from a crashed run
+                continue
+            if rec.get("status") == "ok" or (rec.get("status") == "interrupted" and not retry_interrupted):
+                done.add(str(rec["id"]))
+    return done
+
+
+def _reply_text(out: dict) -> Optional[str]:
+    for m in reversed(out.get("messages", [])):
+        if getattr(m, "type", None) == "ai":
+            return m.content
+    return None
+
+
+def run_conversation(graph, conv: dict, run_id: str) -> dict:
+    """Run every turn of one conversation on its own thread_id."""
+    thread_id = f"batch-{run_id}-{conv['id']}"
+    config = {"configurable": {"thread_id": thread_id}}
+    result = {
+        "id": conv["id"],
+        "thread_id": thread_id,
+        "customer_id": conv.get("customer_id"),
+        "status": "ok",
+        "replies": [],
+        "error": None,
+    }
+    start = time.monotonic()
+    try:
+        for turn in conv["turns"]:
+            state = {"messages": [{"role": "user", "content": turn}]}
+            if conv.get("customer_id") is not None:
+                state["customer_id"] = conv["customer_id"]
+            out = graph.invoke(state, config)
+            result["replies"].append(_reply_text(out))
+            if out.get("__interrupt__"): #human-in-the-loop approval - nobody to answer in a batch
+                result["status"] = "interrupted"
+                break
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["latency_s"] = round(time.monotonic() - start, 3)
+    return result
+
+
+def run_batch(
+    graph,
+    conversations: Iterable[dict],
+    output_path: str,
+    concurrency: int = 8,
+    run_id: Optional[str] = None,
+    on_result: Optional[Callable[[dict], None]] = None,
+    retry_interrupted: bool = False,
+) -> dict:
+    """Run conversations with bounded parallelism, appending results to output_path as they finish."""
+    run_id = run_id or uuid.uuid4().hex[:8]
+    conversations = list(conversations)
+    done = completed_ids(output_path, retry_interrupted)
+    pending = [c for c in conversations if str(c["id"]) not in done]
+    counts = {"ok": 0, "interrupted": 0, "error": 0, "skipped": len(conversations) - len(pending)}
+
+    with open(output_path, "a") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run_conversation, graph, conv, run_id) for conv in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush() #streamed: a crash loses at most the in-flight conversations
+            counts[result["status"]] += 1
+            if on_result:
+                on_result(result)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded conversations through the support graph")
+    parser.add_argument("--input", required=True, help="JSONL of conversations")
+    parser.add_argument("--output", required=True, help="JSONL results (appended; used to resume)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--run-id", default=None, help="prefix for thread_ids (default: random)")
+    parser.add_argument("--retry-interrupted", action="store_true", help="re-run conversations recorded as interrupted")
+    args = parser.parse_args()
+
+    from agent import graph
+
+    conversations = load_conversations(args.input)
+    start = time.monotonic()
+    finished = [0]
+
+    def progress(result):
+        finished[0] += 1
+        if finished[0] % 50 == 0:
+            print(f"{finished[0]} done ({time.monotonic() - start:.1f}s)")
+
+    counts = run_batch(
+        graph, conversations, args.output, args.concurrency, args.run_id, progress,
+        retry_interrupted=args.retry_interrupted,
+    )
+    elapsed = time.monotonic() - start
+    print(f"finished in {elapsed:.1f}s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
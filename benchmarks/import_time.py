@@ -0,0 +1,49 @@
+# benchmarks/import_time.py
+#measures cold import of the graph in a fresh interpreter (what a worker pays on startup)
+#python -m benchmarks.import_time [--runs 5] [--first-use]
+import argparse
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+t0 = time.perf_counter()
+from agent import graph
+print(f"{time.perf_counter() - t0:.4f}")
+"""
+
+#builds the db, model clients and all four agents (needs network + OPENAI_API_KEY)
+FIRST_USE_SNIPPET = """
+import agent, time
+t0 = time.perf_counter()
+agent.get_supervisor(); agent.get_account_agent(); agent.get_inventory_agent(); agent.get_general_agent()
+from utils.database import get_db
+get_db()
+print(f"{time.perf_counter() - t0:.4f}")
+"""
+
+
+def time_snippet(snippet: str) -> float:
+    out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of agent.graph")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-use", action="store_true", help="also time building the lazy resources")
+    args = parser.parse_args()
+
+    imports = [time_snippet(IMPORT_SNIPPET) for _ in range(args.runs)]
+    print(f"import agent.graph: median {statistics.median(imports) * 1000:.1f} ms over {args.runs} runs")
+
+    if args.first_use:
+        builds = [time_snippet(FIRST_USE_SNIPPET) for _ in range(args.runs)]
+        print(f"first use (db + agents): median {statistics.median(builds) * 1000:.1f} ms")
+
+    print("per-module breakdown: python -X importtime -c 'import agent' 2> importtime.log")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# benchmarks/llm_load.py
+#load test for the shared LLM scheduler against a local fake model server
+#(OpenAI-style /v1/chat/completions, streaming included, that enforces its own RPS/TPM and answers 429 above them).
+#Calls go through the same ChatOpenAI setup as utils/model.py get_model:
+#  no scheduler     -> the old client: ChatOpenAI(streaming=True), SDK retries + backoff on 429
+#  shared scheduler -> the same client + scheduled_client_kwargs (ScheduledRateLimiter + SchedulerUsageCallback)
+#python -m benchmarks.llm_load [--requests 200] [--server-rps 20] [--server-tpm 120000]
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.llm_scheduler import get_scheduler, PRIORITY_SUPERVISOR, PRIORITY_AGENT, PRIORITY_BACKGROUND
+
+PRIORITY_NAMES = {PRIORITY_SUPERVISOR: "supervisor", PRIORITY_AGENT: "agent", PRIORITY_BACKGROUND: "background"}
+
+
+def make_fake_server(rps: int, tpm: int, latency: float, tokens_per_call: int) -> ThreadingHTTPServer:
+    lock = threading.Lock()
+    calls: deque[float] = deque()
+    tokens: deque[tuple[float, int]] = deque()
+    counts = {"429": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            now = time.monotonic()
+            with lock:
+                while calls and now - calls[0] > 1.0:
+                    calls.popleft()
+                while tokens and now - tokens[0][0] > 60.0:
+                    tokens.popleft()
+                limited = len(calls) >= rps or sum(t for _, t in tokens) + tokens_per_call > tpm
+                if not limited:
+                    calls.append(now)
+                    tokens.append((now, tokens_per_call))
+                else:
+                    counts["429"] += 1
+            if limited:
+                self.send_response(429)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            time.sleep(latency)
+            usage = {"prompt_tokens": tokens_per_call - 10, "completion_tokens": 10, "total_tokens": tokens_per_call}
+            if request.get("stream"):
+                self._stream(usage if (request.get("stream_options") or {}).get("include_usage") else None)
+                return
+            body = json.dumps({
+                "id": "fake",
+                "object": "chat.completion",
+                "created": 0,
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+                "usage": usage,
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, usage):
+            #SSE chunks like the real API; the connection close ends the body (HTTP/1.0)
+            def chunk(choices, **extra):
+                data = {"id": "fake", "object": "chat.completion.chunk", "created": 0, "model": "fake", "choices": choices, **extra}
+                return f"data: {json.dumps(data)}\n\n".encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            self.wfile.write(chunk([{"index": 0, "delta": {"role": "assistant", "content": "ok"}, "finish_reason": None}]))
+            self.wfile.write(chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+            if usage:
+                self.wfile.write(chunk([], usage=usage))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 1024 #the whole burst connects at once
+
+    server = Server(("127.0.0.1", 0), Handler)
+    server.counts = counts
+    return server
+
+
+def make_client(base_url: str, priority: int | None):
+    """get_model()'s client pointed at the fake server; priority=None -> the old unscheduled client."""
+    from langchain_openai import ChatOpenAI
+    from utils.model import scheduled_client_kwargs
+
+    kwargs = scheduled_client_kwargs(priority) if priority is not None else {}
+    return ChatOpenAI(temperature=0, streaming=True, model="gpt-4o", base_url=base_url, api_key="fake", **kwargs)
+
+
+def run(base_url: str, priorities: list[int], scheduled: bool):
+    """Fire all requests at once through ChatOpenAI (429s are retried by the SDK with its own backoff)."""
+    clients = {p: make_client(base_url, p if scheduled else None) for p in PRIORITY_NAMES}
+    stats = {"failed": 0}
+    stats_lock = threading.Lock()
+
+    def one(priority: int) -> tuple[int, float]:
+        start = time.monotonic()
+        try:
+            clients[priority].invoke("hi")
+        except Exception: #openai.RateLimitError once the SDK's retries are used up
+            with stats_lock:
+                stats["failed"] += 1
+        return priority, time.monotonic() - start
+
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(priorities)) as pool:
+        results = list(pool.map(one, priorities))
+    return time.monotonic() - t0, results, stats
+
+
+def report(label: str, wall: float, results, stats) -> None:
+    print(f"\n== {label} ==")
+    line = f"wall {wall:.2f}s | 429s {stats['429']} | gave up {stats['failed']}"
+    if "in_flight" in stats:
+        line += f" | slots still held after the run {stats['in_flight']}" #must be 0: the callback released them all
+    print(line)
+    for priority, name in PRIORITY_NAMES.items():
+        lat = sorted(l for p, l in results if p == priority)
+        if not lat:
+            continue
+        p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+        print(f"  {name:<10} n={len(lat):<4} p50 {statistics.median(lat):6.2f}s  p95 {p95:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the LLM scheduler against a fake model server")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--server-rps", type=int, default=20)
+    parser.add_argument("--server-tpm", type=int, default=120000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tokens-per-call", type=int, default=500)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    #burst mix: 20% supervisor, 60% sub-agent, 20% background summaries
+    priorities = random.choices(
+        [PRIORITY_SUPERVISOR, PRIORITY_AGENT, PRIORITY_BACKGROUND], weights=[2, 6, 2], k=args.requests
+    )
+
+    def start_server():
+        #fresh server per run so the second run doesn't inherit the first one's rate windows
+        server = make_fake_server(args.server_rps, args.server_tpm, args.latency, args.tokens_per_call)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    server, base_url = start_server()
+    try:
+        wall, results, stats = run(base_url, priorities, scheduled=False)
+        report("no scheduler (SDK retry + backoff on 429)", wall, results, {**stats, **server.counts})
+    finally:
+        server.shutdown()
+
+    #the process-wide scheduler the app uses, configured just under the provider limit
+    os.environ["LLM_MAX_RPS"] = str(args.server_rps * 0.9)
+    os.environ["LLM_MAX_TPM"] = str(args.server_tpm * 0.9)
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    get_scheduler.cache_clear()
+    server, base_url = start_server()
+    try:
+        wall, results, stats = run(base_url, priorities, scheduled=True)
+        report("shared scheduler", wall, results, {**stats, **server.counts, "in_flight": get_scheduler().in_flight})
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
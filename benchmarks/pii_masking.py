@@ -0,0 +1,125 @@
+# benchmarks/pii_masking.py
+#structured row masking (utils/pii.py) vs what the account agent used to run:
+#  middleware path -> json.dumps(rows) into a ToolMessage (what ToolNode does), then the real
+#                     PIIMiddleware("email", strategy="mask", apply_to_tool_results=True).before_model
+#                     hook over an agent state holding that ToolMessage
+#  structured path -> mask_rows(rows), then json.dumps into a ToolMessage
+#The two don't do the same work: the middleware only masks emails, the structured path also masks
+#Phone/Fax/Address/BillingAddress. Emails must come out identical; the extra columns are reported separately.
+#python -m benchmarks.pii_masking [--rows 100 1000 10000]
+import argparse
+import json
+import time
+
+from langchain.agents.middleware import PIIMiddleware
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from utils.pii import PII_COLUMNS, mask_rows
+
+#exactly the middleware the account agent had before utils/pii.py
+MIDDLEWARE = PIIMiddleware("email", strategy="mask", apply_to_input=False, apply_to_tool_results=True)
+TOOL_CALL_ID = "call_1"
+
+
+def invoice_rows(n: int) -> list[dict]:
+    """Rows with exactly the columns past_invoices returns (Invoice.* + UnitPrice, Quantity, TrackName)."""
+    return [
+        {
+            "InvoiceId": 400 - i // 3,
+            "CustomerId": 5,
+            "InvoiceDate": "2013-12-05 00:00:00",
+            "BillingAddress": "Klanova 9/506",
+            "BillingCity": "Prague",
+            "BillingState": None,
+            "BillingCountry": "Czech Republic",
+            "BillingPostalCode": "14700",
+            "Total": 16.86,
+            "UnitPrice": 0.99,
+            "Quantity": 1,
+            "TrackName": f"Track {i}",
+        }
+        for i in range(n)
+    ]
+
+
+def customer_rows() -> list[dict]:
+    """The row get_customer_info returns (SELECT * FROM Customer)."""
+    return [{
+        "CustomerId": 5, "FirstName": "František", "LastName": "Wichterlová", "Company": "JetBrains s.r.o.",
+        "Address": "Klanova 9/506", "City": "Prague", "State": None, "Country": "Czech Republic",
+        "PostalCode": "14700", "Phone": "+420 2 4172 5555", "Fax": "+420 2 4172 5555",
+        "Email": "frantisekw@jetbrains.com", "SupportRepId": 4,
+    }]
+
+
+def _tool_message(rows: list[dict]) -> ToolMessage:
+    #what ToolNode puts in the ToolMessage for a list-of-dicts tool result
+    return ToolMessage(content=json.dumps(rows, ensure_ascii=False), tool_call_id=TOOL_CALL_ID)
+
+
+def middleware_path(rows: list[dict]) -> str:
+    state = {"messages": [
+        HumanMessage(content="show my invoices"),
+        AIMessage(content="", tool_calls=[{"name": "past_invoices", "args": {}, "id": TOOL_CALL_ID}]),
+        _tool_message(rows),
+    ]}
+    update = MIDDLEWARE.before_model(state, None) #runtime is unused by the hook
+    messages = update["messages"] if update else state["messages"]
+    return messages[-1].content
+
+
+def structured_path(rows: list[dict]) -> str:
+    return _tool_message(mask_rows(rows)).content
+
+
+def masked_columns(rows: list[dict], output: str) -> list[str]:
+    out = json.loads(output)
+    return sorted({col for raw, masked in zip(rows, out) for col in PII_COLUMNS if raw.get(col) != masked.get(col)})
+
+
+def check(rows: list[dict]) -> tuple[list[str], list[str]]:
+    """Both paths must mask emails the same way; returns the columns each one masks."""
+    mw, st = middleware_path(rows), structured_path(rows)
+    mw_rows, st_rows = json.loads(mw), json.loads(st)
+    assert [r.get("Email") for r in mw_rows] == [r.get("Email") for r in st_rows], "email masking differs"
+    return masked_columns(rows, mw), masked_columns(rows, st)
+
+
+def bench(fn, rows, repeat: int, number: int = 1) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn(rows)
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PII masking on tool results")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'past_invoices rows':>18} {'PIIMiddleware':>14} {'structured':>12} {'speedup':>8}")
+    for n in args.rows:
+        rows = invoice_rows(n)
+        invoice_cols = check(rows)
+        middleware_s = bench(middleware_path, rows, args.repeat)
+        structured_s = bench(structured_path, rows, args.repeat)
+        print(f"{n:>18} {middleware_s * 1000:>12.2f}ms {structured_s * 1000:>10.2f}ms {middleware_s / structured_s:>7.1f}x")
+
+    rows = customer_rows()
+    customer_cols = check(rows)
+    middleware_s = bench(middleware_path, rows, args.repeat, number=2000)
+    structured_s = bench(structured_path, rows, args.repeat, number=2000)
+    print(f"\nget_customer_info (1 row): PIIMiddleware {middleware_s * 1e6:.1f}us, structured {structured_s * 1e6:.1f}us, "
+          f"{middleware_s / structured_s:.1f}x")
+
+    print("\ncolumns masked (not equal work - the structured path does more):")
+    for label, (mw_cols, st_cols) in (("past_invoices", invoice_cols), ("get_customer_info", customer_cols)):
+        print(f"  {label:<18} PIIMiddleware: {', '.join(mw_cols) or '-'}   structured: {', '.join(st_cols) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Tests for the batch conversation runner (batch_eval.py) using a fake graph - no model calls.
+"""
+import json
+import threading
+
+import pytest
+
+from batch_eval import load_conversations, run_batch
+
+
+class FakeMessage:
+    type = "ai"
+
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeGraph:
+    """Echoes the user turn; fails for conversations whose text contains 'boom'."""
+
+    def __init__(self):
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def invoke(self, state, config):
+        with self.lock:
+            self.threads.add(config["configurable"]["thread_id"])
+        text = state["messages"][0]["content"]
+        if "boom" in text:
+            raise RuntimeError("model down")
+        out = {"messages": [FakeMessage(f"echo:{text}:{state.get('customer_id')}")]}
+        if "approve" in text:
+            out["__interrupt__"] = ["edit_customer_info needs approval"]
+        return out
+
+
+def _write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(r) + "\n" for r in rows))
+
+
+def _read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_runs_conversations_on_separate_threads(tmp_path):
+    src = tmp_path / "in.jsonl"
+    _write_jsonl(src, [
+        {"id": "a", "customer_id": 1, "turns": ["hi", "bye"]},
+        {"id": "b", "customer_id": 2, "input": "hello"},
+    ])
+    out = tmp_path / "out.jsonl"
+    graph = FakeGraph()
+
+    counts = run_batch(graph, load_conversations(src), str(out), concurrency=4, run_id="t")
+
+    assert counts == {"ok": 2, "interrupted": 0, "error": 0, "skipped": 0}
+    assert graph.threads == {"batch-t-a", "batch-t-b"}
+    results = {r["id"]: r for r in _read_jsonl(out)}
+    assert results["a"]["replies"] == ["echo:hi:1", "echo:bye:1"]
+    assert results["b"]["replies"] == ["echo:hello:2"]
+
+
+def test_resume_skips_ok_and_retries_errors(tmp_path):
+    src = tmp_path / "in.jsonl"
+    _write_jsonl(src, [{"id": "a", "input": "hi"}, {"id": "b", "input": "boom"}])
+    out = tmp_path / "out.jsonl"
+
+    first = run_batch(FakeGraph(), load_conversations(src), str(out))
+    assert first["ok"] == 1 and first["error"] == 1
+    assert "model down" in [r for r in _read_jsonl(out) if r["id"] == "b"][0]["error"]
+
+    graph = FakeGraph()
+    second = run_batch(graph, load_conversations(src), str(out), run_id="r2")
+    assert second["skipped"] == 1
+    assert graph.threads == {"batch-r2-b"} #only the failed one is re-run
+
+
+def test_interrupted_is_not_rerun_unless_asked(tmp_path):
+    src = tmp_path / "in.jsonl"
+    _write_jsonl(src, [{"id": "a", "input": "please approve my new email"}, {"id": "b", "input": "hi"}])
+    out = tmp_path / "out.jsonl"
+
+    first = run_batch(FakeGraph(), load_conversations(src), str(out))
+    assert first["interrupted"] == 1 and first["ok"] == 1
+
+    graph = FakeGraph()
+    assert run_batch(graph, load_conversations(src), str(out))["skipped"] == 2
+    assert graph.threads == set()
+
+    graph = FakeGraph()
+    again = run_batch(graph, load_conversations(src), str(out), run_id="r3", retry_interrupted=True)
+    assert again["skipped"] == 1 and graph.threads == {"batch-r3-a"}
+
+
+def test_duplicate_ids_are_rejected(tmp_path):
+    src = tmp_path / "in.jsonl"
+    _write_jsonl(src, [{"id": "a", "input": "hi"}, {"id": "b", "input": "yo"}, {"id": "a", "input": "again"}])
+    with pytest.raises(ValueError, match="duplicate conversation id 'a'.*line 1"):
+        load_conversations(src)
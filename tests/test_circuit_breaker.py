@@ -0,0 +1,150 @@
+"""
+Tests for the per-tool circuit breaker (utils/circuit_breaker.py).
+"""
+import pytest
+
+from utils.circuit_breaker import CircuitBreaker, get_breaker, CLOSED, OPEN, HALF_OPEN
+
+
+def _breaker(**kwargs):
+    now = [0.0]
+    breaker = CircuitBreaker("get_albums_by_artist", clock=lambda: now[0], **kwargs)
+    return breaker, now
+
+
+def test_trips_after_threshold_and_fails_fast():
+    breaker, _ = _breaker(failure_threshold=3, reset_timeout=10)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+
+
+def test_success_resets_failure_count():
+    breaker, _ = _breaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_single_probe():
+    breaker, now = _breaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    now[0] = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True #the probe
+    assert breaker.allow() is False #everyone else still fails fast
+
+    breaker.record_failure() #probe failed -> open again, timer restarted
+    assert breaker.state == OPEN
+    now[0] = 15
+    assert breaker.allow() is False
+
+    now[0] = 20
+    assert breaker.allow() is True
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() is True
+
+
+def test_caches_last_good_result_per_args():
+    breaker, _ = _breaker(cache_size=1)
+    breaker.record_success({"artist": "AC/DC"}, "[('For Those About To Rock', 'AC/DC')]")
+    assert breaker.cached({"artist": "AC/DC"}) == "[('For Those About To Rock', 'AC/DC')]"
+    breaker.record_success({"artist": "Accept"}, "[('Balls to the Wall', 'Accept')]")
+    assert breaker.cached({"artist": "AC/DC"}) is None #evicted
+    breaker.record_success({"artist": "Queen"}, None)
+    assert breaker.cached({"artist": "Queen"}) is None
+
+
+def test_breakers_are_shared_per_tool():
+    assert get_breaker("get_tracks_by_artist") is get_breaker("get_tracks_by_artist")
+    assert get_breaker("get_tracks_by_artist") is not get_breaker("get_info_about_track")
+
+
+def test_neutral_result_frees_probe_without_closing():
+    breaker, now = _breaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_neutral()
+    breaker.record_failure()
+    assert breaker.state == OPEN #bad-args calls don't reset the failure count
+
+    now[0] = 10
+    assert breaker.allow() is True
+    breaker.record_neutral()
+    assert breaker.state == HALF_OPEN #probe said nothing about the dependency
+    assert breaker.allow() is True #but the next call may probe
+
+
+#---- tool_circuit_breaker middleware in agent.py (with ToolRetryMiddleware around it) ----
+
+@pytest.fixture
+def middleware(monkeypatch):
+    pytest.importorskip("langchain")
+    import agent
+    import utils.circuit_breaker as cb
+    from langchain.agents.middleware import ToolRetryMiddleware
+    from langchain.agents.middleware.types import ToolCallRequest
+    from langchain_core.messages import ToolMessage
+
+    monkeypatch.setattr(cb, "_breakers", {})
+    retry = ToolRetryMiddleware(max_retries=3, initial_delay=0.0, max_delay=0.0, jitter=False)
+
+    def run(handler, args=None):
+        request = ToolCallRequest(
+            tool_call={"name": "get_albums_by_artist", "args": args or {"artist": "AC/DC"}, "id": "call_1", "type": "tool_call"},
+            tool=None, state={}, runtime=None,
+        )
+        #same order as inventory_agent: handle_tool_errors -> retry -> circuit breaker -> tool
+        inner = lambda r: agent.tool_circuit_breaker.wrap_tool_call(r, handler)
+        middle = lambda r: retry.wrap_tool_call(r, inner)
+        return agent.handle_tool_errors.wrap_tool_call(request, middle)
+
+    return run, cb.get_breaker("get_albums_by_artist"), ToolMessage
+
+
+def test_middleware_trips_then_serves_cached_and_unavailable(middleware):
+    run, breaker, ToolMessage = middleware
+    calls = []
+
+    def healthy(request):
+        calls.append("ok")
+        return ToolMessage(content="[('For Those About To Rock', 'AC/DC')]", tool_call_id=request.tool_call["id"])
+
+    def down(request):
+        calls.append("down")
+        raise ConnectionError("db down")
+
+    assert run(healthy).content == "[('For Those About To Rock', 'AC/DC')]"
+
+    run(down) #1 try + 3 retries = 4 failures, threshold is 5
+    assert calls.count("down") == 4 and breaker.state == CLOSED
+    run(down) #5th failure trips it; the retry then hits the open breaker instead of the tool
+    assert calls.count("down") == 5 and breaker.state == OPEN
+
+    calls.clear()
+    cached = run(down)
+    assert calls == [] #fail fast: tool not called, nothing retried
+    assert cached.content.startswith("(cached result") and "AC/DC" in cached.content
+
+    unavailable = run(down, {"artist": "Accept"})
+    assert calls == [] and unavailable.status == "error" and "temporarily unavailable" in unavailable.content
+
+
+def test_middleware_treats_bad_args_as_neutral(middleware):
+    run, breaker, ToolMessage = middleware
+
+    def down(request):
+        raise ConnectionError("db down")
+
+    def bad_args(request):
+        return ToolMessage(content="Error invoking tool: missing 'artist'", tool_call_id=request.tool_call["id"], status="error")
+
+    run(down) #4 failures
+    run(bad_args)
+    assert breaker._failures == 4 #not reset by the bad-args result
+    assert breaker.cached({"artist": "AC/DC"}) is None
@@ -0,0 +1,119 @@
+"""
+Tests for the customer profile snapshot: lookup (agents/customer_agent.py), prompt injection into the
+account agent, and how the supervisor loads / refreshes it (agent.py).
+"""
+import sqlite3
+
+import pytest
+
+pytest.importorskip("langchain")
+import agent
+import agents.customer_agent as customer_agent
+from langchain.agents.middleware import ModelRequest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+SCHEMA = """
+CREATE TABLE Customer (CustomerId INTEGER PRIMARY KEY, FirstName TEXT, Company TEXT, Phone TEXT,
+    Email TEXT, SupportRepId INTEGER);
+INSERT INTO Customer VALUES (5, 'František', NULL, '+420 2 4172 5555', 'frantisekw@jetbrains.com', 4);
+"""
+
+PROFILE = {"CustomerId": 5, "FirstName": "František", "Email": "frantisekw@****.com"}
+
+
+@pytest.fixture
+def customer_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "chinook.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.close()
+    engine = type("Engine", (), {"raw_connection": lambda self: sqlite3.connect(path)})()
+    monkeypatch.setattr(customer_agent, "get_engine", lambda: engine)
+
+
+def test_profile_is_masked_and_compact(customer_db):
+    profile = customer_agent.get_customer_profile("5")
+    assert profile == {"CustomerId": 5, "FirstName": "František", "Phone": "****5555", "Email": "frantisekw@****.com"}
+
+
+def test_profile_missing_customer_or_bad_id(customer_db):
+    assert customer_agent.get_customer_profile(99) is None
+    assert customer_agent.get_customer_profile("abc") is None
+
+
+def _system_prompt(state) -> str:
+    seen = {}
+
+    def handler(request):
+        seen["prompt"] = request.system_prompt
+        return AIMessage(content="ok")
+
+    request = ModelRequest(
+        model=GenericFakeChatModel(messages=iter([])), messages=[HumanMessage(content="what's my email?")], state=state,
+    )
+    customer_agent.account_prompt_with_profile.wrap_model_call(request, handler)
+    return seen["prompt"]
+
+
+def test_prompt_includes_snapshot():
+    prompt = _system_prompt({"customer_profile": PROFILE})
+    assert prompt.startswith(customer_agent.customer_system_prompt)
+    assert customer_agent.customer_profile_prompt in prompt and "frantisekw@****.com" in prompt
+
+
+def test_prompt_without_snapshot():
+    assert _system_prompt({"customer_profile": None}) == customer_agent.customer_system_prompt
+    assert _system_prompt({}) == customer_agent.customer_system_prompt
+
+
+def test_edited_profile_only_counts_successful_edits():
+    def edit(status):
+        return ToolMessage(content="done", tool_call_id="1", name="edit_customer_info", status=status)
+
+    assert agent._edited_profile({"messages": [edit("success")]})
+    assert not agent._edited_profile({"messages": [edit("error")]})
+    assert not agent._edited_profile({"messages": [ToolMessage(content="x", tool_call_id="1", name="get_customer_info")]})
+    assert not agent._edited_profile({})
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    seen = []
+
+    class FakeSupervisor:
+        def invoke(self, state, context=None):
+            seen.append(state)
+            return {**state, "messages": [*state["messages"], AIMessage(content="Here you go")]}
+
+    monkeypatch.setattr(agent, "get_supervisor", lambda: FakeSupervisor())
+    return seen
+
+
+def _turn(state):
+    return agent.supervisor_node({"messages": [HumanMessage(content="recommend some rock")], **state})
+
+
+def test_supervisor_runs_when_customer_db_is_down(supervisor, monkeypatch):
+    def down(customer_id):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(agent, "get_customer_profile", down)
+    out = _turn({"customer_id": 5})
+    assert out["messages"][-1].content == "Here you go"
+    assert out["customer_profile"] is None and out["customer_profile_for"] is None #retried next turn
+
+    monkeypatch.setattr(agent, "get_customer_profile", lambda customer_id: PROFILE)
+    out = _turn({"customer_id": 5, **out})
+    assert out["customer_profile"] == PROFILE and out["customer_profile_for"] == "5"
+
+
+def test_supervisor_does_not_refetch_missing_profile(supervisor, monkeypatch):
+    calls = []
+    monkeypatch.setattr(agent, "get_customer_profile", lambda customer_id: calls.append(customer_id))
+    out = _turn({"customer_id": 99})
+    out = _turn({"customer_id": 99, **out})
+    assert calls == [99] and out["customer_profile"] is None
+
+    _turn({**out, "customer_id": 7}) #different customer -> looked up again
+    assert calls == [99, 7]
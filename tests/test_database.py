@@ -0,0 +1,100 @@
+"""
+Tests for the shared file-backed catalog mode (utils/database.py, CHINOOK_DB_PATH) on a stubbed script.
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("langchain_community")
+import utils.database as database
+
+SCRIPT = """
+CREATE TABLE [Employee] ([EmployeeId] INTEGER NOT NULL PRIMARY KEY, [LastName] TEXT);
+CREATE TABLE [Customer] ([CustomerId] INTEGER NOT NULL PRIMARY KEY, [Email] TEXT, [SupportRepId] INTEGER,
+    FOREIGN KEY ([SupportRepId]) REFERENCES [Employee] ([EmployeeId]));
+CREATE TABLE [Invoice] ([InvoiceId] INTEGER NOT NULL PRIMARY KEY, [CustomerId] INTEGER NOT NULL,
+    FOREIGN KEY ([CustomerId]) REFERENCES [Customer] ([CustomerId]));
+INSERT INTO Employee VALUES (3, 'Peacock');
+INSERT INTO Customer VALUES (1, 'luisg@embraer.com.br', 3), (2, 'leonekohler@surfeu.de', 3);
+INSERT INTO Invoice VALUES (98, 1), (121, 2);
+"""
+
+
+def _clear_caches():
+    database.get_engine.cache_clear()
+    database.get_db.cache_clear()
+    database._get_writer_connection.cache_clear()
+
+
+@pytest.fixture
+def file_mode(tmp_path, monkeypatch):
+    path = str(tmp_path / "chinook.db")
+    monkeypatch.setattr(database, "CHINOOK_DB_PATH", path)
+    monkeypatch.setattr(database, "_fetch_chinook_script", lambda: SCRIPT)
+    _clear_caches()
+    yield path
+    _clear_caches()
+
+
+def test_build_moves_customer_to_sidecar(file_mode):
+    import sqlite3
+
+    database.build_chinook_files(file_mode)
+    catalog = sqlite3.connect(file_mode)
+    tables = {r[0] for r in catalog.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "Customer" not in tables and {"Invoice", "Employee"} <= tables
+    customers = sqlite3.connect(database.customers_path_for(file_mode))
+    assert customers.execute("SELECT COUNT(*) FROM Customer").fetchone() == (2,)
+
+
+def test_build_is_skipped_when_files_exist(file_mode, monkeypatch):
+    database.build_chinook_files(file_mode)
+    monkeypatch.setattr(database, "_fetch_chinook_script", lambda: pytest.fail("rebuilt existing catalog"))
+    database.build_chinook_files(file_mode)
+
+
+def test_get_db_reflects_foreign_keys_to_customer(file_mode):
+    db = database.get_db()
+    assert "Invoice" in db.get_usable_table_names()
+    assert "CustomerId" in db.get_table_info(["Invoice"])
+    assert db.run("SELECT i.InvoiceId, c.Email FROM Invoice i JOIN Customer c ON i.CustomerId = c.CustomerId WHERE i.InvoiceId = 98") \
+        == "[(98, 'luisg@embraer.com.br')]"
+
+
+def test_writes_go_through_writer_and_are_visible_to_readers(file_mode):
+    conn = database.get_engine().raw_connection()
+    assert database.execute_write("UPDATE Customer SET Email = ? WHERE CustomerId = ?", ("new@embraer.com.br", 1)) == 1
+    cursor = conn.cursor()
+    cursor.execute("SELECT Email FROM Customer WHERE CustomerId = 1")
+    assert cursor.fetchone() == ("new@embraer.com.br",)
+
+
+def test_reader_is_read_only(file_mode):
+    import sqlite3
+
+    conn = database.get_engine().raw_connection()
+    with pytest.raises(sqlite3.OperationalError):
+        conn.cursor().execute("UPDATE Invoice SET CustomerId = 2 WHERE InvoiceId = 98")
+
+
+def test_get_engine_builds_once_under_concurrent_first_use(monkeypatch):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    builds = []
+
+    def slow_build():
+        builds.append(threading.get_ident())
+        time.sleep(0.2)
+        return object()
+
+    monkeypatch.setattr(database, "CHINOOK_DB_PATH", None)
+    monkeypatch.setattr(database, "get_engine_for_chinook_db", slow_build)
+    _clear_caches()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            engines = list(pool.map(lambda _: database.get_engine(), range(8)))
+    finally:
+        _clear_caches()
+    assert len(builds) == 1
+    assert all(e is engines[0] for e in engines)
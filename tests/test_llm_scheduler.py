@@ -0,0 +1,193 @@
+"""
+Tests for the shared LLM scheduler (utils/llm_scheduler.py) - no model calls needed.
+"""
+import threading
+import time
+
+import pytest
+
+from utils.llm_scheduler import LLMScheduler, SharedTokenBucket, TokenBucket, PRIORITY_SUPERVISOR, PRIORITY_BACKGROUND
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    bucket = TokenBucket(rate=2.0, capacity=1.0, clock=lambda: now[0])
+    assert bucket.time_until(1) == 0.0
+    bucket.take(1)
+    assert bucket.time_until(1) == 0.5
+    now[0] = 0.5
+    assert bucket.time_until(1) == 0.0
+
+
+def test_rps_is_paced():
+    scheduler = LLMScheduler(max_rps=20)
+    start = time.monotonic()
+    for _ in range(5):
+        scheduler.acquire()
+        scheduler.release()
+    #first call is free, the next 4 are spaced 50ms apart
+    assert time.monotonic() - start >= 0.18
+
+
+def test_shared_bucket_is_one_budget_across_instances(tmp_path):
+    now = [0.0]
+    path = str(tmp_path / "budget.rps")
+    a = SharedTokenBucket(path, rate=1.0, capacity=1.0, clock=lambda: now[0])
+    b = SharedTokenBucket(path, rate=1.0, capacity=1.0, clock=lambda: now[0])
+    assert a.try_take(1) == 0.0
+    assert b.try_take(1) == 1.0 #a already took the only token
+    now[0] = 1.0
+    assert b.try_take(1) == 0.0
+
+
+def _acquire_in_worker(budget_path, n):
+    scheduler = LLMScheduler(max_rps=20, budget_path=budget_path)
+    for _ in range(n):
+        scheduler.acquire()
+        scheduler.release()
+
+
+def test_shared_budget_paces_rps_across_processes(tmp_path):
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_acquire_in_worker, args=(str(tmp_path / "llm_budget"), 5)) for _ in range(2)]
+    start = time.monotonic()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(timeout=30)
+    assert all(w.exitcode == 0 for w in workers)
+    #10 grants at 20 RPS in total (not per worker): the last one can't come before ~450ms
+    assert time.monotonic() - start >= 0.4
+
+
+def test_token_debt_blocks_until_refilled():
+    scheduler = LLMScheduler(max_tpm=600) #10 tokens/s
+    scheduler.acquire()
+    scheduler.release(tokens_used=605) #5 tokens in debt
+    assert scheduler.acquire(timeout=0) is False
+    assert scheduler.acquire(timeout=2.0) is True
+
+
+def test_concurrency_limit_queues_instead_of_failing():
+    scheduler = LLMScheduler(max_concurrency=1)
+    scheduler.acquire()
+    assert scheduler.acquire(timeout=0.05) is False
+    threading.Timer(0.05, scheduler.release).start()
+    assert scheduler.acquire(timeout=2.0) is True
+
+
+def test_supervisor_priority_served_before_background():
+    scheduler = LLMScheduler(max_concurrency=1)
+    scheduler.acquire() #hold the only slot so both callers queue
+    order = []
+
+    def worker(priority, name):
+        scheduler.acquire(priority)
+        order.append(name)
+        scheduler.release()
+
+    background = threading.Thread(target=worker, args=(PRIORITY_BACKGROUND, "background"))
+    background.start()
+    time.sleep(0.05) #background is queued first...
+    supervisor = threading.Thread(target=worker, args=(PRIORITY_SUPERVISOR, "supervisor"))
+    supervisor.start()
+    time.sleep(0.05)
+    scheduler.release()
+    background.join(2)
+    supervisor.join(2)
+    assert order == ["supervisor", "background"] #...but supervisor goes first
+
+
+def test_aacquire_respects_priority_and_concurrency():
+    import asyncio
+
+    async def main():
+        scheduler = LLMScheduler(max_concurrency=1)
+        scheduler.acquire() #hold the only slot
+        order = []
+
+        async def worker(priority, name):
+            await scheduler.aacquire(priority)
+            order.append(name)
+            scheduler.release()
+
+        background = asyncio.create_task(worker(PRIORITY_BACKGROUND, "background"))
+        await asyncio.sleep(0.05)
+        supervisor = asyncio.create_task(worker(PRIORITY_SUPERVISOR, "supervisor"))
+        await asyncio.sleep(0.1)
+        assert order == [] #both queued behind the held slot
+        scheduler.release()
+        await asyncio.wait_for(asyncio.gather(background, supervisor), 2)
+        return order, scheduler.in_flight
+
+    assert asyncio.run(main()) == (["supervisor", "background"], 0)
+
+
+def test_cancelled_aacquire_leaves_the_queue():
+    import asyncio
+
+    async def main():
+        scheduler = LLMScheduler(max_concurrency=1)
+        scheduler.acquire()
+        waiter = asyncio.create_task(scheduler.aacquire())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        scheduler.release()
+        return scheduler.acquire(timeout=0.5) #not stuck behind the cancelled ticket
+
+    assert asyncio.run(main()) is True
+
+
+#---- langchain hooks (utils/model.py) ----
+
+def _scheduled_fake_model(monkeypatch, scheduler, replies, **kwargs):
+    pytest.importorskip("langchain_core")
+    import utils.model as model_module
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    monkeypatch.setattr(model_module, "get_scheduler", lambda: scheduler)
+    messages = iter([
+        AIMessage(content=text, usage_metadata={"input_tokens": 90, "output_tokens": 10, "total_tokens": 100})
+        for text in replies
+    ])
+    return GenericFakeChatModel(
+        messages=messages,
+        rate_limiter=model_module.ScheduledRateLimiter(PRIORITY_SUPERVISOR),
+        callbacks=[model_module.SchedulerUsageCallback()],
+        **kwargs,
+    )
+
+
+def test_model_call_acquires_and_releases_with_token_usage(monkeypatch):
+    scheduler = LLMScheduler(max_tpm=6000, max_concurrency=2)
+    model = _scheduled_fake_model(monkeypatch, scheduler, ["hi"])
+    assert model.invoke("hello").content == "hi"
+    assert scheduler.in_flight == 0
+    assert scheduler._tpm.tokens < 6000 - 99 #usage debited
+
+
+def test_async_model_call_releases_slot(monkeypatch):
+    import asyncio
+
+    scheduler = LLMScheduler(max_concurrency=2)
+    model = _scheduled_fake_model(monkeypatch, scheduler, ["hi"])
+    assert asyncio.run(model.ainvoke("hello")).content == "hi"
+    assert scheduler.in_flight == 0
+
+
+def test_cache_hit_does_not_release_someone_elses_slot(monkeypatch):
+    from langchain_core.caches import InMemoryCache
+
+    scheduler = LLMScheduler(max_concurrency=2)
+    model = _scheduled_fake_model(monkeypatch, scheduler, ["hi"], cache=InMemoryCache())
+    scheduler.acquire() #a slot held by another call
+    model.invoke("hello") #miss: acquire + release
+    model.invoke("hello") #hit: skips the rate limiter, must not release
+    assert scheduler.in_flight == 1
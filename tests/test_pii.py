@@ -0,0 +1,29 @@
+"""
+Tests for structured PII masking of DB rows (utils/pii.py).
+"""
+from utils.pii import mask_email, mask_phone, mask_rows
+
+
+def test_mask_email_hides_domain():
+    assert mask_email("luisg@embraer.com.br") == "luisg@****.br"
+    assert mask_email("not-an-email") == "****"
+
+
+def test_mask_phone_keeps_last_four_digits():
+    assert mask_phone("+55 (12) 3923-5555") == "****5555"
+    assert mask_phone("123") == "****"
+
+
+def test_mask_rows_only_touches_pii_columns():
+    rows = [{"CustomerId": 1, "FirstName": "Luís", "Email": "luisg@embraer.com.br",
+             "Phone": "+55 (12) 3923-5555", "Address": "Av. Brigadeiro Faria Lima, 2170", "Fax": None}]
+    masked = mask_rows(rows)
+    assert masked[0] == {"CustomerId": 1, "FirstName": "Luís", "Email": "luisg@****.br",
+                         "Phone": "****5555", "Address": "****", "Fax": None}
+    assert rows[0]["Email"] == "luisg@embraer.com.br" #input rows are not mutated
+
+
+def test_mask_rows_without_pii_columns_is_passthrough():
+    rows = [{"TrackName": "Balls to the Wall", "UnitPrice": 0.99}]
+    assert mask_rows(rows) is rows
+    assert mask_rows([]) == []
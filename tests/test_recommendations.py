@@ -0,0 +1,92 @@
+"""
+Tests for the track similarity index (utils/recommendations.py) on a tiny Chinook-shaped DB.
+"""
+import os
+import sqlite3
+
+import pytest
+
+np = pytest.importorskip("numpy")
+from utils.recommendations import TrackIndex, build_track_index
+
+SCHEMA = """
+CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name TEXT);
+CREATE TABLE Album (AlbumId INTEGER PRIMARY KEY, Title TEXT, ArtistId INTEGER);
+CREATE TABLE Genre (GenreId INTEGER PRIMARY KEY, Name TEXT);
+CREATE TABLE Track (TrackId INTEGER PRIMARY KEY, Name TEXT, AlbumId INTEGER, GenreId INTEGER, Composer TEXT);
+CREATE TABLE Invoice (InvoiceId INTEGER PRIMARY KEY, CustomerId INTEGER);
+CREATE TABLE InvoiceLine (InvoiceLineId INTEGER PRIMARY KEY, InvoiceId INTEGER, TrackId INTEGER);
+
+INSERT INTO Artist VALUES (1, 'AC/DC'), (2, 'Accept'), (3, 'Miles Davis');
+INSERT INTO Album VALUES (1, 'For Those About To Rock', 1), (2, 'Balls to the Wall', 2), (3, 'Kind of Blue', 3);
+INSERT INTO Genre VALUES (1, 'Rock'), (2, 'Jazz');
+INSERT INTO Track VALUES
+    (1, 'For Those About To Rock', 1, 1, 'Angus Young, Malcolm Young, Brian Johnson'),
+    (2, 'Put The Finger On You', 1, 1, 'Angus Young, Malcolm Young, Brian Johnson'),
+    (3, 'Balls to the Wall', 2, 1, NULL),
+    (4, 'So What', 3, 2, 'Miles Davis'),
+    (5, 'Blue in Green', 3, 2, 'Miles Davis, Bill Evans');
+INSERT INTO Invoice VALUES (1, 10), (2, 11);
+INSERT INTO InvoiceLine VALUES (1, 1, 1), (2, 1, 3), (3, 2, 4), (4, 2, 5);
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+    build_track_index(conn, str(tmp_path))
+    return TrackIndex(str(tmp_path))
+
+
+def test_index_is_memory_mapped_and_normalized(index):
+    assert isinstance(index.embeddings, np.memmap)
+    assert np.allclose(np.linalg.norm(index.embeddings, axis=1), 1.0, atol=1e-5)
+
+
+def test_recommends_same_album_and_genre_first(index):
+    recs = index.recommend("For Those About To Rock", k=2)
+    assert [r["Name"] for r in recs] == ["Put The Finger On You", "Balls to the Wall"]
+    assert recs[0]["score"] >= recs[1]["score"]
+
+
+def test_artist_query_excludes_seed_tracks(index):
+    recs = index.recommend("miles davis", k=5)
+    assert {r["Name"] for r in recs} == {"For Those About To Rock", "Put The Finger On You", "Balls to the Wall"}
+
+
+def test_unknown_seed_returns_nothing(index):
+    assert index.recommend("Nonexistent Band") == []
+
+
+def _build_in_worker(index_dir, db_path, log_path):
+    from utils.recommendations import ensure_track_index
+
+    def connect():
+        with open(log_path, "a") as f:
+            f.write("built\n")
+        return sqlite3.connect(db_path)
+
+    ensure_track_index(index_dir, connect=connect)
+
+
+def test_concurrent_workers_build_index_once(tmp_path):
+    import multiprocessing
+
+    db_path, log_path, index_dir = str(tmp_path / "chinook.db"), str(tmp_path / "builds.log"), str(tmp_path / "index")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    conn.close()
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_build_in_worker, args=(index_dir, db_path, log_path)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(timeout=30)
+    assert all(w.exitcode == 0 for w in workers)
+
+    with open(log_path) as f:
+        assert f.read().count("built") == 1
+    assert not [p for p in os.listdir(index_dir) if p.endswith(".tmp")]
+    assert TrackIndex(index_dir).recommend("So What", k=1)[0]["Name"] == "Blue in Green"
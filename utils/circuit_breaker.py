@@ -0,0 +1,105 @@
+# utils/circuit_breaker.py
+#Per-tool circuit breakers, shared by every agent/thread in the process.
+#closed    -> calls go through; `failure_threshold` consecutive failures trip it open
+#open      -> calls fail fast (no tool call, no retry backoff) until `reset_timeout` passes
+#half_open -> one probe call is let through; success closes it, failure re-opens it
+#While open we answer with the last good result for the same args if we have one (degraded).
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        cache_size: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.cache_size = cache_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._cache: OrderedDict[str, Any] = OrderedDict() #last good result per args
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """True if the call may go through (closed, or the single half-open probe)."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._probing: #someone else is already probing
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self, args: Optional[dict] = None, result: Any = None) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+            if args is not None and result is not None:
+                key = _cache_key(args)
+                self._cache[key] = result
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def record_neutral(self) -> None:
+        """Call finished but says nothing about the dependency (e.g. bad args from the model):
+        keep the state and failure count, just free the half-open probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+
+    def cached(self, args: dict) -> Optional[Any]:
+        with self._lock:
+            return self._cache.get(_cache_key(args))
+
+
+def _cache_key(args: dict) -> str:
+    return json.dumps(args, sort_keys=True, default=str)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """One shared breaker per tool name."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
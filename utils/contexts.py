@@ -8,6 +8,7 @@ class AccountState(AgentState):
     customer_id: Optional[int]
     account_state: Optional[str]
     account_example_context: Optional[str]
+    customer_profile: Optional[dict] #preloaded snapshot from the supervisor
 
 class InventoryState(AgentState):
     customer_id: Optional[int]
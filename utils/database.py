@@ -1,15 +1,34 @@
 #PART OF STARTER CODE!
+import os
 import sqlite3
-import requests
-from langchain_community.utilities.sql_database import SQLDatabase
-from sqlalchemy import create_engine
-from sqlalchemy.pool import StaticPool
+import threading
+from utils.lazy import cached_once
+
+CHINOOK_URL = "https://raw.githubusercontent.com/lerocha/chinook-database/master/ChinookDatabase/DataSources/Chinook_Sqlite.sql"
+
+#MULTI-PROCESS MODE: set CHINOOK_DB_PATH to a file path and every worker opens the same
+#read-only catalog file (immutable + mmap -> pages are shared through the OS page cache)
+#instead of downloading and rebuilding its own in-memory copy.
+#Customer is the only table we write to, so it lives in a small sidecar file
+#(<name>.customers.db) that is ATTACHed to the catalog and written through execute_write().
+CHINOOK_DB_PATH = os.getenv("CHINOOK_DB_PATH")
+MMAP_SIZE = int(os.getenv("CHINOOK_MMAP_SIZE", str(256 * 1024 * 1024)))
+BUSY_TIMEOUT_MS = 5000
+
+
+def _fetch_chinook_script() -> str:
+    import requests
+    response = requests.get(CHINOOK_URL)
+    response.raise_for_status()
+    return response.text
+
 
 def get_engine_for_chinook_db():
     """Pull sql file, populate in-memory database, and create engine."""
-    url = "https://raw.githubusercontent.com/lerocha/chinook-database/master/ChinookDatabase/DataSources/Chinook_Sqlite.sql"
-    response = requests.get(url)
-    sql_script = response.text
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+
+    sql_script = _fetch_chinook_script()
 
     connection = sqlite3.connect(":memory:", check_same_thread=False)
     connection.executescript(sql_script)
@@ -20,5 +39,151 @@ def get_engine_for_chinook_db():
         connect_args={"check_same_thread": False},
     )
 
-engine = get_engine_for_chinook_db()
-db = SQLDatabase(engine)
\ No newline at end of file
+
+#---------------- file-backed (multi-process) mode ----------------
+
+def customers_path_for(catalog_path: str) -> str:
+    root, _ = os.path.splitext(catalog_path)
+    return f"{root}.customers.db"
+
+
+def build_chinook_files(catalog_path: str) -> None:
+    """Build the read-only catalog file and the writable Customer sidecar (run once, not per worker)."""
+    import fcntl
+
+    customers_path = customers_path_for(catalog_path)
+    os.makedirs(os.path.dirname(os.path.abspath(catalog_path)), exist_ok=True)
+
+    #file lock so only one process builds when several workers start at once
+    with open(f"{catalog_path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(catalog_path) and os.path.exists(customers_path):
+            return
+
+        tmp_catalog = f"{catalog_path}.tmp"
+        tmp_customers = f"{customers_path}.tmp"
+        for p in (tmp_catalog, tmp_customers):
+            if os.path.exists(p):
+                os.remove(p)
+
+        conn = sqlite3.connect(tmp_catalog)
+        try:
+            conn.executescript(_fetch_chinook_script())
+            (customer_ddl,) = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'Customer'"
+            ).fetchone()
+
+            cust = sqlite3.connect(tmp_customers)
+            try:
+                cust.execute(customer_ddl)
+                cust.execute("PRAGMA journal_mode=WAL") #readers in other workers see commits without blocking
+                cust.commit()
+            finally:
+                cust.close()
+
+            conn.execute("ATTACH DATABASE ? AS cust", (tmp_customers,))
+            conn.execute("INSERT INTO cust.Customer SELECT * FROM main.Customer")
+            conn.commit()
+            conn.execute("DETACH DATABASE cust")
+            conn.execute("DROP TABLE main.Customer") #unqualified `Customer` now resolves to the attached file
+            conn.commit()
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+        os.replace(tmp_customers, customers_path)
+        os.replace(tmp_catalog, catalog_path)
+
+
+def _connect_reader(catalog_path: str) -> sqlite3.Connection:
+    """Read-only connection: immutable, memory-mapped catalog + read-only view of Customer."""
+    conn = sqlite3.connect(
+        f"file:{catalog_path}?mode=ro&immutable=1",
+        uri=True,
+        check_same_thread=False,
+    )
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("ATTACH DATABASE ? AS customers", (f"file:{customers_path_for(catalog_path)}?mode=ro",))
+    #Invoice still has a foreign key to Customer, and SQLAlchemy reflection (get_db()) only looks in
+    #main/temp - a TEMP view (the only kind allowed to reference an attached db) makes it resolvable
+    conn.execute("CREATE TEMP VIEW Customer AS SELECT * FROM customers.Customer")
+    return conn
+
+
+def get_engine_for_chinook_file(catalog_path: str):
+    """Engine over the shared catalog file (builds it first if it doesn't exist yet)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+
+    build_chinook_files(catalog_path)
+    connection = _connect_reader(catalog_path)
+    return create_engine(
+        "sqlite://",
+        creator=lambda: connection,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+
+#the single writer path: one connection per process to the Customer file, serialized with a lock
+#(SQLite itself serializes writers across processes; busy_timeout makes them wait instead of failing)
+_write_lock = threading.Lock()
+
+@cached_once
+def _get_writer_connection() -> sqlite3.Connection:
+    conn = sqlite3.connect(customers_path_for(CHINOOK_DB_PATH), check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def execute_write(sql: str, params: tuple = ()) -> int:
+    """Run a write against Customer and commit. Returns the number of rows changed."""
+    if not CHINOOK_DB_PATH:
+        conn = get_engine().raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            conn.commit()
+            changed = cursor.rowcount
+            cursor.close()
+            return changed
+        finally:
+            conn.close()
+
+    with _write_lock:
+        conn = _get_writer_connection()
+        cursor = conn.execute(sql, params)
+        conn.commit()
+        return cursor.rowcount
+
+
+#built once per process, on first use (not at import) -> safe to fork workers before first use
+@cached_once
+def get_engine():
+    if CHINOOK_DB_PATH:
+        return get_engine_for_chinook_file(CHINOOK_DB_PATH)
+    return get_engine_for_chinook_db()
+
+@cached_once
+def get_db():
+    from langchain_community.utilities.sql_database import SQLDatabase
+    return SQLDatabase(get_engine())
+
+
+def __getattr__(name):
+    #keeps `from utils.database import db, engine` working (resolved lazily)
+    if name == "db":
+        return get_db()
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    #prebuild the shared files before starting workers:
+    #CHINOOK_DB_PATH=./data/chinook.db python -m utils.database
+    if not CHINOOK_DB_PATH:
+        raise SystemExit("Set CHINOOK_DB_PATH to the catalog file to build")
+    build_chinook_files(CHINOOK_DB_PATH)
+    print(f"Built {CHINOOK_DB_PATH} and {customers_path_for(CHINOOK_DB_PATH)}")
@@ -0,0 +1,35 @@
+# utils/lazy.py
+#Getters for expensive per-process objects (engine, db, model clients, agents, scheduler).
+#functools.lru_cache holds no lock while the function runs, so threads that miss the cache
+#together each build their own copy. cached_once checks the cache, takes the getter's lock,
+#checks again and only then builds -> exactly one build per process, concurrent callers wait for it.
+import threading
+from functools import wraps
+from typing import Any, Callable
+
+
+def cached_once(fn: Callable) -> Callable:
+    cache: dict = {}
+    lock = threading.RLock()
+
+    def key_of(args: tuple, kwargs: dict) -> tuple:
+        return args + tuple(sorted(kwargs.items()))
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs) -> Any:
+        key = key_of(args, kwargs)
+        try:
+            return cache[key] #fast path, no lock once built
+        except KeyError:
+            pass
+        with lock:
+            if key not in cache: #someone else may have built it while we waited
+                cache[key] = fn(*args, **kwargs)
+            return cache[key]
+
+    def cache_clear() -> None:
+        with lock:
+            cache.clear()
+
+    wrapper.cache_clear = cache_clear #same name as lru_cache, tests reset getters with it
+    return wrapper
@@ -0,0 +1,232 @@
+# utils/llm_scheduler.py
+#Shared scheduler for outbound LLM calls (all agents + the injection judge).
+#Enforces requests/second, tokens/minute and max in-flight calls, and hands out
+#slots in priority order -> user-facing supervisor calls go before background summaries.
+#Callers queue (block) instead of failing, so we stop tripping provider 429s under bursts.
+#Pure stdlib so it can be load tested without langchain (see benchmarks/llm_load.py);
+#the langchain hooks (rate_limiter + usage callback) live in utils/model.py.
+#Budgets are per process unless LLM_BUDGET_PATH is set: then the RPS/TPM buckets live in small files
+#that every worker on the host draws from (fcntl-locked), so N workers still send LLM_MAX_RPS in total.
+import asyncio
+import fcntl
+import heapq
+import itertools
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from utils.lazy import cached_once
+from typing import Callable, Optional
+
+#lower number = served first
+PRIORITY_SUPERVISOR = 0
+PRIORITY_AGENT = 1
+PRIORITY_BACKGROUND = 2
+
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class TokenBucket:
+    """Refills at `rate` tokens/second up to `capacity`. Balance may go negative (debt)."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def try_take(self, amount: float) -> float:
+        """Take `amount` if available now and return 0, else return the seconds to wait."""
+        wait = self.time_until(amount)
+        if wait == 0:
+            self.take(amount)
+        return wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose balance lives in a file, shared by every process on the host.
+    Each operation is a read-modify-write under an fcntl lock (same pattern as build_chinook_files).
+    The default clock (CLOCK_MONOTONIC) is system-wide, so timestamps compare across processes."""
+
+    _STATE = struct.Struct("dd") #tokens, last refill
+
+    def __init__(self, path: str, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__(rate, capacity, clock)
+        self.path = path
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._fd_lock = threading.Lock() #flock only excludes other open files, not threads sharing this one
+
+    @contextmanager
+    def _locked(self):
+        with self._fd_lock:
+            if self._pid != os.getpid(): #an fd inherited over fork shares its lock with the parent -> reopen
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                self._pid = os.getpid()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(self._fd, self._STATE.size, 0)
+                if len(data) == self._STATE.size:
+                    self.tokens, self._updated = self._STATE.unpack(data)
+                else: #first user of the file starts with a full bucket
+                    self.tokens, self._updated = self.capacity, self._clock()
+                yield
+                os.pwrite(self._fd, self._STATE.pack(self.tokens, self._updated), 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def time_until(self, amount: float) -> float:
+        with self._locked():
+            return super().time_until(amount)
+
+    def take(self, amount: float) -> None:
+        with self._locked():
+            super().take(amount)
+
+    def try_take(self, amount: float) -> float:
+        with self._locked(): #check and take in one lock, or two workers could both take the last token
+            wait = TokenBucket.time_until(self, amount)
+            if wait == 0:
+                TokenBucket.take(self, amount)
+            return wait
+
+
+class LLMScheduler:
+    """Priority queue in front of the provider budgets.
+
+    - max_rps: requests per second, paced evenly (providers count over sliding windows)
+    - max_tpm: tokens per minute; usage is only known after a call, so it is debited on
+      release() and later calls wait while the bucket is in debt
+    - max_concurrency: calls in flight at once
+    Any limit set to 0/None is disabled.
+    With budget_path the RPS/TPM buckets are shared with every process using the same path;
+    concurrency and priority order stay per process.
+    """
+
+    def __init__(
+        self,
+        max_rps: Optional[float] = None,
+        max_tpm: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        budget_path: Optional[str] = None,
+    ):
+        def bucket(name, rate, capacity):
+            if budget_path:
+                return SharedTokenBucket(f"{budget_path}.{name}", rate, capacity, clock)
+            return TokenBucket(rate, capacity, clock)
+
+        self._rps = bucket("rps", max_rps, 1.0) if max_rps else None #capacity 1 -> evenly paced, no burst
+        self._tpm = bucket("tpm", max_tpm / 60.0, max_tpm) if max_tpm else None
+        self.max_concurrency = max_concurrency or None
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[int, int]] = [] #heap of (priority, seq) tickets
+        self._seq = itertools.count()
+
+    def _enqueue(self, priority: int) -> tuple[int, int]:
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _dequeue(self, ticket: tuple[int, int]) -> None:
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._cond.notify_all()
+
+    def _try_grant(self, ticket: tuple[int, int]) -> Optional[float]:
+        """Caller holds the lock. 0.0 = granted, >0 = retry after that many seconds,
+        None = not this ticket's turn yet (wait for a notify)."""
+        if self._waiting[0] != ticket:
+            return None
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            return None
+        if self._tpm:
+            wait = self._tpm.time_until(1)
+            if wait > 0:
+                return wait
+        if self._rps: #last check, and atomic: with a shared budget another worker may take the token
+            wait = self._rps.try_take(1)
+            if wait > 0:
+                return wait
+        heapq.heappop(self._waiting)
+        self.in_flight += 1
+        self._cond.notify_all() #next ticket becomes head
+        return 0.0
+
+    def acquire(self, priority: int = PRIORITY_AGENT, timeout: Optional[float] = None) -> bool:
+        """Block until a slot is granted. Returns False only if `timeout` expires."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ticket = self._enqueue(priority)
+            while True:
+                wait = self._try_grant(ticket)
+                if wait == 0.0:
+                    return True
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._dequeue(ticket)
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    async def aacquire(self, priority: int = PRIORITY_AGENT) -> None:
+        """Async version of acquire() - polls so the event loop is never blocked."""
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_grant(ticket)
+                if wait == 0.0:
+                    return
+                await asyncio.sleep(min(wait or ASYNC_POLL_INTERVAL, ASYNC_POLL_INTERVAL))
+        except asyncio.CancelledError:
+            with self._cond:
+                if ticket in self._waiting:
+                    self._dequeue(ticket)
+            raise
+
+    def release(self, tokens_used: int = 0) -> None:
+        """Call once per granted acquire, when the LLM call finishes (or fails)."""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if self._tpm and tokens_used:
+                self._tpm.take(tokens_used)
+            self._cond.notify_all()
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+#one scheduler per process, shared by every model client
+@cached_once
+def get_scheduler() -> LLMScheduler:
+    return LLMScheduler(
+        max_rps=_env_number("LLM_MAX_RPS", 5),
+        max_tpm=_env_number("LLM_MAX_TPM", 30000),
+        max_concurrency=int(_env_number("LLM_MAX_CONCURRENCY", 8)),
+        budget_path=os.getenv("LLM_BUDGET_PATH") or None,
+    )
@@ -1,11 +1,107 @@
+import threading
+from contextvars import ContextVar
+from utils.lazy import cached_once
+from typing import Optional
+from uuid import UUID
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+from utils.llm_scheduler import get_scheduler, PRIORITY_AGENT
 
 load_dotenv()
 
-# Shared model instance for all agents
-model = ChatOpenAI(temperature=0, streaming=True, model="gpt-4o")
 
+#hooks every client into the shared scheduler (utils/llm_scheduler.py):
+#the rate limiter waits for a slot before the request, the callback hands it back with the token usage.
+#LangChain skips the rate limiter on a cache hit but still fires on_llm_end, so slots are tracked per
+#run_id: on_chat_model_start records the run, acquire() marks it as holding a slot, and end/error only
+#release runs that actually hold one.
+_current_run: ContextVar[Optional[UUID]] = ContextVar("scheduler_current_run", default=None)
+_held_runs: set = set()
+_held_lock = threading.Lock()
 
 
+def _mark_held() -> None:
+    run_id = _current_run.get()
+    if run_id is None: #no usage callback on this client -> nobody would hand the slot back
+        get_scheduler().release(0)
+        return
+    with _held_lock:
+        _held_runs.add(run_id)
 
+
+def _take_held(run_id) -> bool:
+    with _held_lock:
+        if run_id in _held_runs:
+            _held_runs.discard(run_id)
+            return True
+        return False
+
+
+class ScheduledRateLimiter(BaseRateLimiter):
+    def __init__(self, priority: int):
+        self.priority = priority
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        granted = get_scheduler().acquire(self.priority, timeout=None if blocking else 0)
+        if granted:
+            _mark_held()
+        return granted
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return self.acquire(blocking=False)
+        await get_scheduler().aacquire(self.priority)
+        _mark_held()
+        return True
+
+
+def _total_tokens(response) -> int:
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    total = 0 #streaming responses carry usage on the message instead
+    for generations in response.generations:
+        for gen in generations:
+            metadata = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+            total += metadata.get("total_tokens", 0)
+    return total
+
+
+class SchedulerUsageCallback(BaseCallbackHandler):
+    run_inline = True #same context as the model call, so _current_run is visible to the rate limiter
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        _current_run.set(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        if _take_held(run_id):
+            get_scheduler().release(_total_tokens(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        if _take_held(run_id):
+            get_scheduler().release(0)
+
+
+def scheduled_client_kwargs(priority: int) -> dict:
+    """kwargs for a ChatOpenAI client that should go through the shared scheduler"""
+    return {
+        "rate_limiter": ScheduledRateLimiter(priority),
+        "callbacks": [SchedulerUsageCallback()],
+        "stream_usage": True, #so streamed calls still report tokens for the TPM budget
+    }
+
+
+# Shared model instance for all agents - built on first use so importing is cheap
+#one client per priority (supervisor / sub-agents / background summary)
+@cached_once
+def get_model(priority: int = PRIORITY_AGENT):
+    from langchain_openai import ChatOpenAI #deferred: pulls in the openai SDK
+    return ChatOpenAI(temperature=0, streaming=True, model="gpt-4o", **scheduled_client_kwargs(priority))
+
+
+def __getattr__(name):
+    #keeps `from utils.model import model` working (resolved lazily)
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
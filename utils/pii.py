@@ -0,0 +1,52 @@
+# utils/pii.py
+#Structured PII masking for DB rows: we know which columns hold PII, so mask those values
+#directly before the rows are serialized into a ToolMessage, instead of regex-scanning
+#the whole rendered string after every tool call (what PIIMiddleware does).
+from typing import Any, Callable
+
+
+def mask_email(value: str) -> str:
+    #keep the local part, hide the domain
+    local, sep, domain = value.partition("@")
+    if not sep:
+        return "****"
+    tld = domain.rsplit(".", 1)[-1] if "." in domain else ""
+    return f"{local}@****.{tld}" if tld else f"{local}@****"
+
+
+def mask_phone(value: str) -> str:
+    digits = [c for c in value if c.isdigit()]
+    return f"****{''.join(digits[-4:])}" if len(digits) > 4 else "****"
+
+
+def mask_address(value: str) -> str:
+    return "****"
+
+
+#column name -> masker (Customer, Invoice and Employee column names in Chinook)
+PII_COLUMNS: dict[str, Callable[[str], str]] = {
+    "Email": mask_email,
+    "Phone": mask_phone,
+    "Fax": mask_phone,
+    "Address": mask_address,
+    "BillingAddress": mask_address,
+}
+
+
+def mask_row(row: dict[str, Any], columns: dict[str, Callable[[str], str]] = PII_COLUMNS) -> dict[str, Any]:
+    masked = dict(row)
+    for col, masker in columns.items():
+        value = masked.get(col)
+        if value: #leave None / "" as is
+            masked[col] = masker(str(value))
+    return masked
+
+
+def mask_rows(rows: list[dict[str, Any]], columns: dict[str, Callable[[str], str]] = PII_COLUMNS) -> list[dict[str, Any]]:
+    """Mask PII columns in query results (row dicts from cursor.description + fetchall)."""
+    if not rows:
+        return rows
+    present = {col: masker for col, masker in columns.items() if col in rows[0]} #rows share columns
+    if not present:
+        return rows
+    return [mask_row(row, present) for row in rows]
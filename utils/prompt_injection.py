@@ -1,11 +1,18 @@
 # utils/prompt_injection.py
+from utils.lazy import cached_once
 from typing import Any, Dict
 from langchain.agents.middleware import before_agent, AgentState
 from langgraph.runtime import Runtime
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
+from utils.model import scheduled_client_kwargs
+from utils.llm_scheduler import PRIORITY_SUPERVISOR
 
-judge = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+#judge model is only built the first time the guard runs
+#(it gates every user turn, so it shares the supervisor's priority)
+@cached_once
+def get_judge():
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0, **scheduled_client_kwargs(PRIORITY_SUPERVISOR))
 
 @before_agent(can_jump_to=["end"])
 def prompt_injection_guard(state: AgentState, runtime: Runtime) -> Dict[str, Any] | None:
@@ -30,7 +37,7 @@ MESSAGE:
 {message_content}
 """
 
-    verdict = judge.invoke([HumanMessage(content=prompt)])
+    verdict = get_judge().invoke([HumanMessage(content=prompt)])
     label = (verdict.content or "").strip().upper()
 
     if "INJECTION" in label:
@@ -0,0 +1,203 @@
+# utils/recommendations.py
+#Track similarity index for grounded recommendations (no LLM calls).
+#Each track gets a vector made of weighted, L2-normalized blocks:
+#  genre one-hot | artist one-hot | album one-hot | composer multi-hot | co-purchase (which customers bought it)
+#Cosine similarity between two tracks = weighted sum of the per-block cosines.
+#Built offline into <dir>/embeddings.npy (float32, memory-mapped at query time) + <dir>/tracks.json.
+#python -m utils.recommendations [out_dir]    (default TRACK_INDEX_PATH or <repo>/data/track_index)
+import fcntl
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from utils.lazy import cached_once
+
+#anchored to the repo (not the CWD) so workers started from different directories share one index
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRACK_INDEX_PATH = os.path.abspath(os.getenv("TRACK_INDEX_PATH", os.path.join(_REPO_ROOT, "data", "track_index")))
+
+BLOCK_WEIGHTS = {
+    "genre": 0.5,
+    "artist": 0.6,
+    "album": 0.3,
+    "composer": 0.4,
+    "co_purchase": 1.0,
+}
+
+_TRACKS_SQL = """
+    SELECT Track.TrackId, Track.Name, Track.Composer, Track.AlbumId, Track.GenreId,
+           Album.Title AS Album, Artist.ArtistId, Artist.Name AS Artist, Genre.Name AS Genre
+    FROM Track
+    LEFT JOIN Album ON Track.AlbumId = Album.AlbumId
+    LEFT JOIN Artist ON Album.ArtistId = Artist.ArtistId
+    LEFT JOIN Genre ON Track.GenreId = Genre.GenreId
+    ORDER BY Track.TrackId
+"""
+
+_PURCHASES_SQL = """
+    SELECT DISTINCT InvoiceLine.TrackId, Invoice.CustomerId
+    FROM InvoiceLine
+    JOIN Invoice ON InvoiceLine.InvoiceId = Invoice.InvoiceId
+"""
+
+
+def _split_composers(composer) -> list[str]:
+    if not composer:
+        return []
+    return [c.strip().lower() for c in re.split(r"[,/&]| and ", composer) if c.strip()]
+
+
+def _one_hot_block(rows: np.ndarray, cols: np.ndarray, n_rows: int, n_cols: int) -> np.ndarray:
+    block = np.zeros((n_rows, n_cols), dtype=np.float32)
+    block[rows, cols] = 1.0
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    np.divide(block, norms, out=block, where=norms > 0)
+    return block
+
+
+def build_track_index(conn, out_dir: str = TRACK_INDEX_PATH) -> None:
+    """Build the index from a DB-API connection to Chinook (offline, once)."""
+    cursor = conn.cursor()
+    cursor.execute(_TRACKS_SQL)
+    cols = [d[0] for d in cursor.description]
+    tracks = [dict(zip(cols, row)) for row in cursor.fetchall()]
+    cursor.execute(_PURCHASES_SQL)
+    purchases = cursor.fetchall()
+    cursor.close()
+
+    n = len(tracks)
+    row_of = {t["TrackId"]: i for i, t in enumerate(tracks)}
+
+    def pairs_block(pairs, n_cols):
+        if not pairs:
+            return np.zeros((n, 1), dtype=np.float32)
+        r, c = (np.array(x, dtype=np.int64) for x in zip(*pairs))
+        return _one_hot_block(r, c, n, n_cols)
+
+    def categorical(key):
+        values: dict = {}
+        pairs = [(i, values.setdefault(t[key], len(values))) for i, t in enumerate(tracks) if t[key] is not None]
+        return pairs_block(pairs, len(values))
+
+    composer_ids: dict[str, int] = {}
+    comp_pairs = []
+    for i, t in enumerate(tracks):
+        for name in _split_composers(t["Composer"]):
+            comp_pairs.append((i, composer_ids.setdefault(name, len(composer_ids))))
+
+    customer_ids: dict[int, int] = {}
+    buy_pairs = []
+    for track_id, customer_id in purchases:
+        if track_id in row_of:
+            buy_pairs.append((row_of[track_id], customer_ids.setdefault(customer_id, len(customer_ids))))
+
+    blocks = {
+        "genre": categorical("GenreId"),
+        "artist": categorical("ArtistId"),
+        "album": categorical("AlbumId"),
+        "composer": pairs_block(comp_pairs, len(composer_ids)),
+        "co_purchase": pairs_block(buy_pairs, len(customer_ids)),
+    }
+    total = sum(BLOCK_WEIGHTS.values())
+    embeddings = np.hstack([np.sqrt(BLOCK_WEIGHTS[k] / total) * b for k, b in blocks.items()]).astype(np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+
+    os.makedirs(out_dir, exist_ok=True)
+    meta = [{k: t[k] for k in ("TrackId", "Name", "Artist", "Album", "Genre", "Composer")} for t in tracks]
+    #write to unique temp files then rename, so a reader never sees half an index and two builders
+    #never write the same file; tracks.json goes first since embeddings.npy marks the index as present
+    _atomic_write(out_dir, "tracks.json", lambda f: f.write(json.dumps(meta).encode()))
+    _atomic_write(out_dir, "embeddings.npy", lambda f: np.save(f, embeddings))
+
+
+def _atomic_write(out_dir: str, name: str, write) -> None:
+    fd, tmp = tempfile.mkstemp(dir=out_dir, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, os.path.join(out_dir, name))
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _index_exists(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, "embeddings.npy"))
+
+
+def _connect_live_db():
+    from utils.database import get_engine
+    return get_engine().raw_connection()
+
+
+def ensure_track_index(index_dir: str = TRACK_INDEX_PATH, force: bool = False, connect=_connect_live_db) -> None:
+    """Build the index unless it exists. A file lock (same pattern as build_chinook_files) makes sure
+    only one process builds when several workers hit their first recommendation at once."""
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, ".build.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if _index_exists(index_dir) and not force: #someone else built it while we waited
+            return
+        conn = connect()
+        try:
+            build_track_index(conn, index_dir)
+        finally:
+            conn.close()
+
+
+class TrackIndex:
+    def __init__(self, index_dir: str):
+        #mmap: workers share the pages, nothing is copied into the heap
+        self.embeddings = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode="r")
+        with open(os.path.join(index_dir, "tracks.json")) as f:
+            self.tracks = json.load(f)
+        self._names = [(t["Name"] or "").lower() for t in self.tracks]
+        self._artists = [(t["Artist"] or "").lower() for t in self.tracks]
+
+    def find(self, query: str) -> list[int]:
+        """Rows whose track name matches, else rows by a matching artist."""
+        q = query.strip().lower()
+        if not q:
+            return []
+        exact = [i for i, name in enumerate(self._names) if name == q]
+        if exact:
+            return exact
+        by_name = [i for i, name in enumerate(self._names) if q in name]
+        return by_name or [i for i, artist in enumerate(self._artists) if q in artist]
+
+    def recommend(self, query: str, k: int = 5) -> list[dict]:
+        seeds = self.find(query)
+        if not seeds:
+            return []
+        centroid = np.asarray(self.embeddings[seeds]).mean(axis=0)
+        scores = self.embeddings @ centroid
+        scores[seeds] = -np.inf #don't recommend what they asked about
+        k = min(k, len(scores) - len(seeds))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**{key: self.tracks[i][key] for key in ("Name", "Artist", "Album", "Genre")}, "score": round(float(scores[i]), 3)}
+            for i in top
+        ]
+
+
+#loaded once per process on first use; built from the live DB if nobody prebuilt it
+@cached_once
+def get_track_index() -> TrackIndex:
+    if not _index_exists(TRACK_INDEX_PATH):
+        ensure_track_index(TRACK_INDEX_PATH)
+    return TrackIndex(TRACK_INDEX_PATH)
+
+
+if __name__ == "__main__":
+    import sys
+
+    out_dir = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else TRACK_INDEX_PATH
+    ensure_track_index(out_dir, force=True)
+    print(f"Built track index in {out_dir}")